@@ -10,27 +10,164 @@ and auto-incremented CSV filename creation (_001, _002, ...)
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import calendar
-from datetime import datetime, timedelta
+import functools
+from datetime import datetime, timedelta, timezone
 import csv
+import gzip
+import io
 import json
 import re
 import os
 import configparser
 import sys
+import urllib.parse
+import email.utils
+import threading
+from dataclasses import dataclass, field
+from collections import deque
+from itertools import compress as select_kept
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    # optional: much faster JSON decoding of the activity pages and encoding of events
+    import orjson
+except ImportError:
+    orjson = None
 
 # =============================
 # INITIAL AUTH / FALLBACKS
 # =============================
 AUTH_HOST = "https://api.sse.cisco.com"
 AUTH_URL = f"{AUTH_HOST}/auth/v2/token"
-# default reports base (will be overridden after auth)
+# default reports base (AuthContext.reports_base is updated after auth)
 REPORTS_BASE = "https://api.umbrella.com/reports.us"
 
 CATEGORIES_PATH = "/reports/v2/categories"
 ACTIVITY_PATH = "/reports/v2/activity"
 
+# =============================
+# HTTP SESSION (KEEP-ALIVE)
+# =============================
+# one pooled session for the whole run, so auth/report calls reuse their
+# TCP+TLS connections instead of paying a new handshake per request
+SESSION = requests.Session()
+# the hour, minute-fallback and page pools nest (up to 4 x 8 x 4 requests), so
+# every activity request takes one of HTTP_SLOTS first: never more requests in
+# flight than pooled connections (no "Connection pool is full" churn)
+HTTP_MAX_CONNECTIONS = 32
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=HTTP_MAX_CONNECTIONS, max_retries=0))
+HTTP_SLOTS = threading.BoundedSemaphore(HTTP_MAX_CONNECTIONS)
+
+# activity endpoint URL -> regional URL it redirected to (query stripped), so
+# later pages go straight to the right host instead of paying a 302 each time
+REDIRECT_CACHE = {}
+
+def json_dumps(obj) -> str:
+    # compact UTF-8 JSON; orjson and the stdlib fallback produce equivalent JSON
+    # (the text can differ in details such as float formatting: 1e-7 vs 1e-07)
+    if type(obj) is RawEvent:
+        # event whose source text already is the stdlib compact form: no re-encoding
+        return obj.raw_json
+    if orjson:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            # orjson.JSONEncodeError (a value orjson cannot encode): use the stdlib
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+class RawEvent(dict):
+    """
+    Event of an activity page that also keeps its JSON text from the response,
+    so writing it out again (Full Event JSON, raw CSV, JSONL) skips encoding.
+    Only made (without orjson) when that text is exactly what the stdlib
+    json_dumps() would produce anyway, so reusing it does not change the
+    output. (A key repeated within one object would still show twice; the
+    API does not send those.)
+    """
+    __slots__ = ("raw_json",)
+
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WS_RE = re.compile(r'[ \t\n\r]*')
+# JSON text already in compact json_dumps() form: no whitespace between tokens,
+# no escapes in strings, integers only (no fraction/exponent, -0, NaN, Infinity)
+_COMPACT_JSON_RE = re.compile(r'(?:"[^"\\]*"|[\[\]{}:,truefalsn]+|-?[1-9][0-9]*(?![.eE])|0(?![.eE]))*')
+
+def _loads_activity_page(text: str):
+    """
+    json.loads() for an activity page, except that the objects of its "data"
+    array come back as RawEvent holding their own slice of `text` when that
+    slice is already compact (see RawEvent).
+    """
+    decode = _JSON_DECODER.raw_decode
+    ws = _JSON_WS_RE.match
+    compact = _COMPACT_JSON_RE.fullmatch
+    i = ws(text, 0).end()
+    if text[i:i + 1] != "{":
+        return json.loads(text)
+    page = {}
+    i = ws(text, i + 1).end()
+    closing = "}" if text[i:i + 1] == "}" else ","
+    while closing == ",":
+        # raw_decode() takes any value here; object keys must be strings
+        if text[i:i + 1] != '"':
+            raise json.JSONDecodeError("Expecting property name enclosed in double quotes", text, i)
+        key, i = decode(text, i)
+        i = ws(text, i).end()
+        if text[i:i + 1] != ":":
+            raise json.JSONDecodeError("Expecting ':' delimiter", text, i)
+        i = ws(text, i + 1).end()
+        if key == "data" and text[i:i + 1] == "[":
+            value = []
+            i = ws(text, i + 1).end()
+            item_closing = "]" if text[i:i + 1] == "]" else ","
+            while item_closing == ",":
+                start = i
+                item, i = decode(text, i)
+                raw = text[start:i]
+                if type(item) is dict and compact(raw):
+                    item = RawEvent(item)
+                    item.raw_json = raw
+                value.append(item)
+                i = ws(text, i).end()
+                item_closing = text[i:i + 1]
+                if item_closing == ",":
+                    i = ws(text, i + 1).end()
+                elif item_closing != "]":
+                    raise json.JSONDecodeError("Expecting ',' delimiter", text, i)
+            i += 1
+        else:
+            value, i = decode(text, i)
+        page[key] = value
+        i = ws(text, i).end()
+        closing = text[i:i + 1]
+        if closing == ",":
+            i = ws(text, i + 1).end()
+        elif closing != "}":
+            raise json.JSONDecodeError("Expecting ',' delimiter", text, i)
+    i = ws(text, i + 1).end()
+    if i != len(text):
+        raise json.JSONDecodeError("Extra data", text, i)
+    return page
+
+def json_loads_page(content: bytes):
+    """
+    Decode an activity page. orjson re-encodes events faster than they can be
+    sliced out of the text, so the RawEvent decoding is only used without it.
+    """
+    if orjson:
+        # parse the raw body bytes directly (no text decoding step in between);
+        # note orjson reads integers beyond 64 bits as floats
+        return orjson.loads(content)
+    return _loads_activity_page(content.decode(json.detect_encoding(content), "surrogatepass"))
+
+def strip_query(url: str) -> str:
+    parts = urllib.parse.urlsplit(url)
+    return urllib.parse.urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+
 # =============================
 # TIME UTILITIES
 # =============================
@@ -46,15 +183,23 @@ def elapsed(start_ts: float) -> str:
 # =============================
 # UNIQUE FILENAME GENERATOR
 # =============================
+def split_report_ext(filename: str) -> tuple[str, str]:
+    # like os.path.splitext, but keeps ".csv.gz" / ".jsonl.gz" together
+    if filename.endswith(".gz"):
+        base, ext = os.path.splitext(filename[:-3])
+        return base, ext + ".gz"
+    return os.path.splitext(filename)
+
 def get_unique_filename(filename: str) -> str:
     """
     If filename exists, append _001, _002, etc., before the extension.
     Example:
         report.csv -> report_001.csv
+        report.csv.gz -> report_001.csv.gz
     """
     if not os.path.exists(filename):
         return filename
-    base, ext = os.path.splitext(filename)
+    base, ext = split_report_ext(filename)
     counter = 1
     while True:
         new_filename = f"{base}_{counter:03d}{ext}"
@@ -62,30 +207,112 @@ def get_unique_filename(filename: str) -> str:
             return new_filename
         counter += 1
 
+# =============================
+# CHECKPOINT / RESUME
+# =============================
+def find_resumable_file(filename: str, run_params: dict):
+    """
+    Walk the same filename sequence as get_unique_filename and return the
+    first existing file whose checkpoint belongs to an unfinished run with
+    the same run_params, as (filename, last_done, size), or (None, None, None).
+    """
+    base, ext = split_report_ext(filename)
+    candidate = filename
+    counter = 0
+    while os.path.exists(candidate):
+        if os.path.exists(f"{candidate}.state"):
+            last_done, size = load_checkpoint(f"{candidate}.state", run_params)
+            if last_done:
+                return candidate, last_done, size
+            print(f"ℹ️ '{candidate}' has an unfinished run with other filters or format; not resuming it.")
+        counter += 1
+        candidate = f"{base}_{counter:03d}{ext}"
+    return None, None, None
+
+def load_checkpoint(state_file: str, run_params: dict):
+    """
+    Returns (last_done, size): the last fully written (year, month, day, hour)
+    and the output file size at that point, or (None, None) if there is no
+    usable checkpoint or it was written by a run with other run_params
+    (API filters, output format), whose rows must not be mixed in.
+    """
+    try:
+        with open(state_file, encoding="utf-8") as sf:
+            state = json.load(sf)
+        if state["run"] != run_params:
+            return None, None
+        return tuple(state["last_done"]), int(state["size"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, None
+
+def save_checkpoint(state_file: str, last_done: tuple, size: int, run_params: dict):
+    # write-then-rename so a crash never leaves a half-written checkpoint
+    tmp_file = f"{state_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as sf:
+        json.dump({"last_done": list(last_done), "size": size, "run": run_params}, sf)
+    os.replace(tmp_file, state_file)
+
 # =============================
 # RATE LIMITER
 # =============================
 class RateLimiter:
+    """
+    Token bucket: max_requests tokens refill evenly over per_seconds, so
+    requests are paced instead of bursting at a fixed window boundary.
+    """
     def __init__(self, max_requests=18000, per_seconds=3600):
         self.max_requests = max_requests
         self.per_seconds = per_seconds
-        self.window_start = time.time()
-        self.count = 0
+        self.rate = max_requests / per_seconds
+        self.tokens = max_requests
+        # monotonic, so wall-clock jumps do not refill or drain the bucket
+        self.last = time.monotonic()
+        # shared by the hour / minute-fallback / page worker threads
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.max_requests, self.tokens + (now - self.last) * self.rate)
+        self.last = now
 
     def check(self):
-        now = time.time()
-        if now - self.window_start >= self.per_seconds:
-            self.window_start = now
-            self.count = 0
-        if self.count >= self.max_requests:
-            wait = int(self.per_seconds - (now - self.window_start))
-            if wait < 0:
-                wait = 0
-            print(f"\n⏸️ Rate limit reached ({self.max_requests}/hour). Waiting {wait}s...")
+        with self._lock:
+            self._refill()
+            # take the token now even if that leaves a debt: each caller waits for
+            # its own share of the debt, so concurrent callers queue up one
+            # 1/rate apart instead of all sleeping on the same stale value
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        # sleep outside the lock so other threads can take their place in line
+        if wait > 0:
+            if wait >= 1:
+                print(f"\n⏸️ Rate limit reached ({self.max_requests}/hour). Waiting {wait:.1f}s...")
             time.sleep(wait)
-            self.window_start = time.time()
-            self.count = 0
-        self.count += 1
+
+    def pause(self, seconds: float):
+        """
+        Drain the bucket so every caller of check() waits about `seconds`
+        (used when the API answers 429).
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+def parse_retry_after(value, default: float = 5) -> float:
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP-date).
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
 
 # =============================
 # AUTHENTICATION
@@ -114,13 +341,13 @@ def discover_region_from_headers(headers: dict) -> str:
             return v
     return "us"
 
-def get_token_and_reports_base(client_id: str, client_secret: str, timeout: int = 30) -> tuple[str, str]:
+def get_token_and_reports_base(client_id: str, client_secret: str, timeout: int = 30) -> tuple[str, str, int]:
     """
     Request client credentials token and discover the proper reports base URL.
-    Returns: (access_token, reports_base_url)
+    Returns: (access_token, reports_base_url, expires_in_seconds)
     """
     try:
-        resp = requests.post(
+        resp = SESSION.post(
             AUTH_URL,
             data={"grant_type": "client_credentials"},
             auth=(client_id, client_secret),
@@ -135,6 +362,7 @@ def get_token_and_reports_base(client_id: str, client_secret: str, timeout: int
     token = data.get("access_token")
     if not token:
         raise RuntimeError(f"No access_token in auth response: {data}")
+    expires_in = int(data.get("expires_in", 3600))
 
     region = discover_region_from_headers(resp.headers)
     reports_base = "https://api.umbrella.com/reports.us"
@@ -151,19 +379,61 @@ def get_token_and_reports_base(client_id: str, client_secret: str, timeout: int
             else:
                 reports_base = f"https://api.umbrella.com/reports.{region}"
 
-    return token, reports_base
+    return token, reports_base, expires_in
 
-def prompt_credentials_with_test() -> tuple[str, str, str]:
-    # global must be declared at top because we assign to it inside
-    global REPORTS_BASE
+@dataclass
+class AuthContext:
+    """
+    Credentials, access token and reports base URL of the run, shared by
+    reference with every fetch (and worker thread). The token is renewed
+    `refresh_margin` seconds before it expires, or on demand after a 403.
+    """
+    client_id: str
+    client_secret: str = field(repr=False)
+    token: str = field(default="", repr=False)
+    expires_at: float = 0.0
+    reports_base: str = REPORTS_BASE
+    refresh_margin: int = 60
+    _header: dict = field(default_factory=dict, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def _renew(self):
+        token, reports_base, expires_in = get_token_and_reports_base(self.client_id, self.client_secret)
+        self.token = token
+        self.expires_at = time.time() + expires_in - self.refresh_margin
+        self.reports_base = reports_base
+        # built once per token and shared by all requests (treat as read-only)
+        self._header = {"Authorization": f"Bearer {token}"}
+
+    def auth_header(self) -> dict:
+        with self._lock:
+            if not self.token or time.time() >= self.expires_at:
+                try:
+                    self._renew()
+                except RuntimeError:
+                    if not self.token:
+                        raise
+                    # keep the current token; a 403 will force a refresh
+            return self._header
+
+    def refresh(self, stale_header: dict = None):
+        """
+        Force a renewal (e.g. after a 403). Skipped if another thread already
+        replaced the token that `stale_header` was built from.
+        """
+        with self._lock:
+            if stale_header is None or stale_header is self._header:
+                self._renew()
+
+def prompt_credentials_with_test() -> AuthContext:
     while True:
         client_id = input("🔑 CLIENT_ID: ").strip()
         client_secret = input("🔑 CLIENT_SECRET: ").strip()
         try:
-            token, reports_base = get_token_and_reports_base(client_id, client_secret)
-            print(f"✅ Authentication OK. Reports base: {reports_base}\n")
-            REPORTS_BASE = reports_base
-            return client_id, client_secret, token
+            auth = AuthContext(client_id, client_secret)
+            auth.auth_header()
+            print(f"✅ Authentication OK. Reports base: {auth.reports_base}\n")
+            return auth
         except Exception as e:
             print(f"❌ Authentication failed: {e}")
             print("Please try again.\n")
@@ -240,18 +510,18 @@ def interactive_prompt_dates() -> tuple[int, int, list[int], str]:
 # =============================
 # GET ALL AVAILABLE CATEGORIES - HANDLE REDIRECT
 # =============================
-def get_all_available_categories(token: str) -> list[dict]:
-    headers = {"Authorization": f"Bearer {token}"}
-    endpoint = f"{REPORTS_BASE}{CATEGORIES_PATH}"
+def get_all_available_categories(auth: AuthContext) -> list[dict]:
+    headers = auth.auth_header()
+    endpoint = f"{auth.reports_base}{CATEGORIES_PATH}"
     try:
-        resp = requests.get(endpoint, headers=headers, timeout=30, allow_redirects=False)
+        resp = SESSION.get(endpoint, headers=headers, timeout=30, allow_redirects=False)
         if resp.status_code == 302:
             redirected_url = resp.headers.get("Location")
             if not redirected_url:
                 print("❌ 302 redirect without Location header")
                 return []
             print(f"🔹 Following redirect to: {redirected_url}")
-            resp = requests.get(redirected_url, headers=headers, timeout=30)
+            resp = SESSION.get(redirected_url, headers=headers, timeout=30)
         resp.raise_for_status()
         all_categories_response = resp.json()
         all_categories = all_categories_response.get("data", [])
@@ -273,42 +543,43 @@ def get_all_available_categories(token: str) -> list[dict]:
 # =============================
 # FETCH ACTIVITY WINDOW WITH REDIRECT AND 403 HANDLING
 # =============================
-def fetch_activity_window(token, client_id, client_secret, from_ts, to_ts,
+def fetch_activity_window(auth, from_ts, to_ts,
                           limit=1000, offset_ceiling=None, verbose=False,
                           rate_limiter=None, filters=None,
-                          activity_endpoint_url=None):
-    # we may update REPORTS_BASE on token refresh; declare global at top
-    global REPORTS_BASE
-
+                          activity_endpoint_url=None, page_window=4):
     # activity_endpoint_url is expected to be a fully qualified URL (no params)
     offset = 0
     events = []
     need_minute_fallback = False
+    # set once the API has answered 200 for this window
+    got_any_200 = False
     consecutive_403 = 0
     max_403_attempts = 5
+    consecutive_429 = 0
+    max_429_attempts = 10
     max_retries_conn = 5
 
-    while True:
-        if offset_ceiling is not None and offset >= offset_ceiling:
-            need_minute_fallback = True
-            if verbose:
-                print(f"   ⚠️ Offset {offset} >= ceiling {offset_ceiling}. Activating fallback minute-by-minute.")
-            break
+    # query parameters shared by every page of this window; only "offset" varies
+    base_params = {"from": str(from_ts), "to": str(to_ts), "limit": limit}
+    if filters:
+        base_params.update(filters)
 
+    def fetch_page(page_offset):
+        # returns (response or None if it could not be fetched, auth header used)
         if rate_limiter:
             rate_limiter.check()
 
-        params = {"from": str(from_ts), "to": str(to_ts), "limit": limit, "offset": offset}
-        if filters:
-            params.update(filters)
-
-        headers = {"Authorization": f"Bearer {token}"}
+        # a fresh dict per page, since pages of a window are fetched concurrently
+        params = {**base_params, "offset": page_offset}
+        headers = auth.auth_header()
         resp = None
 
         # Connection retry loop
         for attempt in range(max_retries_conn):
             try:
-                resp = requests.get(activity_endpoint_url, headers=headers, params=params, timeout=60, allow_redirects=False)
+                request_url = REDIRECT_CACHE.get(activity_endpoint_url, activity_endpoint_url)
+                with HTTP_SLOTS:
+                    resp = SESSION.get(request_url, headers=headers, params=params, timeout=60, allow_redirects=False)
                 break
             except (requests.exceptions.ConnectionError,
                     requests.exceptions.ChunkedEncodingError,
@@ -319,28 +590,64 @@ def fetch_activity_window(token, client_id, client_secret, from_ts, to_ts,
 
         if resp is None:
             print("   🚨 Repeated connection failures. Aborting this interval.")
-            break
+            return None, headers
+
+        if request_url != activity_endpoint_url and resp.status_code not in (200, 302):
+            # the cached regional URL failed (e.g. 403/404): forget it, so the next
+            # request goes to the original endpoint and follows its redirect again
+            if REDIRECT_CACHE.get(activity_endpoint_url) == request_url:
+                REDIRECT_CACHE.pop(activity_endpoint_url, None)
 
         # Handle redirect (302)
         if resp.status_code == 302:
             redirected_url = resp.headers.get("Location")
-            if redirected_url:
-                if verbose:
-                    print(f"🔹 Following redirect to: {redirected_url}")
-                try:
-                    # follow the redirect with the same headers/params
-                    resp = requests.get(redirected_url, headers=headers, params=params, timeout=60)
-                except Exception as e:
-                    print(f"   ❌ Failed to fetch redirected URL: {e}")
-                    break
-            else:
+            if not redirected_url:
                 print("   ❌ 302 redirect received but no Location header.")
-                break
+                return None, headers
+            if verbose:
+                print(f"🔹 Following redirect to: {redirected_url}")
+            try:
+                # follow the redirect with the same headers/params
+                with HTTP_SLOTS:
+                    resp = SESSION.get(redirected_url, headers=headers, params=params, timeout=60)
+            except Exception as e:
+                print(f"   ❌ Failed to fetch redirected URL: {e}")
+                return None, headers
+            if resp.status_code == 200:
+                REDIRECT_CACHE[activity_endpoint_url] = strip_query(redirected_url)
+        return resp, headers
+
+    # responses already fetched for offset, offset + limit, ... (in that order)
+    pending = []
+
+    while True:
+        if offset_ceiling is not None and offset >= offset_ceiling:
+            need_minute_fallback = True
+            if verbose:
+                print(f"   ⚠️ Offset {offset} >= ceiling {offset_ceiling}. Activating fallback minute-by-minute.")
+            break
+
+        if not pending:
+            if events and page_window > 1:
+                # the previous page was full, so the next ones are likely to exist too:
+                # request a window of pages concurrently instead of one RTT per page
+                offsets = [offset + i * limit for i in range(page_window)]
+                if offset_ceiling is not None:
+                    offsets = [o for o in offsets if o < offset_ceiling]
+                with ThreadPoolExecutor(max_workers=len(offsets)) as executor:
+                    pending = list(executor.map(fetch_page, offsets))
+            else:
+                pending = [fetch_page(offset)]
+
+        resp, used_headers = pending.pop(0)
+        if resp is None:
+            break
 
         # Success
         if resp.status_code == 200:
+            got_any_200 = True
             try:
-                payload = resp.json()
+                payload = json_loads_page(resp.content)
             except Exception as e:
                 print(f"   ⚠️ Failed to parse JSON: {e}, response: {resp.text[:200]}")
                 break
@@ -352,6 +659,7 @@ def fetch_activity_window(token, client_id, client_secret, from_ts, to_ts,
             if verbose:
                 print(f"      🔹 {len(batch)} events fetched (offset now {offset})")
             consecutive_403 = 0
+            consecutive_429 = 0
             if len(batch) < limit:
                 break
             continue
@@ -359,11 +667,10 @@ def fetch_activity_window(token, client_id, client_secret, from_ts, to_ts,
         # 403 handling -> refresh token and possibly region
         if resp.status_code == 403:
             consecutive_403 += 1
+            pending.clear()
             print(f"   ⚠️ HTTP 403 detected ({consecutive_403}/{max_403_attempts}). Refreshing token...")
             try:
-                new_token, new_reports_base = get_token_and_reports_base(client_id, client_secret)
-                token = new_token
-                REPORTS_BASE = new_reports_base
+                auth.refresh(used_headers)
             except Exception as e:
                 print(f"   ❌ Failed to refresh token: {e}")
                 time.sleep(5)
@@ -372,78 +679,194 @@ def fetch_activity_window(token, client_id, client_secret, from_ts, to_ts,
                 break
             continue
 
-        # Client errors trigger minute fallback
+        # 429 handling -> wait as told by Retry-After, then retry the same offset
+        if resp.status_code == 429:
+            consecutive_429 += 1
+            pending.clear()
+            if consecutive_429 > max_429_attempts:
+                print("   🚨 Persistent 429 after several retries. Stopping this interval.")
+                break
+            wait = parse_retry_after(resp.headers.get("Retry-After"))
+            print(f"   ⚠️ HTTP 429 rate limited ({consecutive_429}/{max_429_attempts}). Waiting {wait:.0f}s...")
+            if rate_limiter:
+                # pause every worker sharing the limiter; the retry waits in check()
+                rate_limiter.pause(wait)
+            else:
+                time.sleep(wait)
+            continue
+
+        # Client errors trigger minute fallback, but only when the window really
+        # holds more than a page; an error on the first page (e.g. a quiet hour)
+        # would just be repeated by the 60 minute requests
         if resp.status_code in (400, 404):
-            need_minute_fallback = True
-            print(f"   ⚠️ HTTP {resp.status_code} — activating minute-by-minute fallback for this hour.")
+            need_minute_fallback = got_any_200 and len(events) >= limit
+            if need_minute_fallback:
+                print(f"   ⚠️ HTTP {resp.status_code} — activating minute-by-minute fallback for this hour.")
+            else:
+                print(f"   ⚠️ HTTP {resp.status_code} on the first page — no minute fallback for this window.")
             break
 
         # Other errors
         print(f"   ⚠️ HTTP {resp.status_code} returned. Message: {resp.text[:200]}")
         break
 
-    return events, need_minute_fallback, token
+    return events, need_minute_fallback
 
 # =============================
 # FETCH HOUR WITH MINUTE FALLBACK
 # =============================
-def fetch_hour_with_minute_fallback(token, client_id, client_secret, hour_start_dt,
-                                    limit=1000, offset_ceiling=10000, verbose=True,
-                                    rate_limiter=None, filters=None,
-                                    activity_endpoint_url=None):
-    hour_end_dt = hour_start_dt + timedelta(hours=1) - timedelta(milliseconds=1)
-    from_ts = dt_to_epoch_millis(hour_start_dt)
-    to_ts = dt_to_epoch_millis(hour_end_dt)
-
-    if verbose:
-        print(f"\n⏳ Hourly: {fmt_dt(hour_start_dt)} to {fmt_dt(hour_end_dt)}")
-
-    hour_events_from_api, need_minute_fallback, token = fetch_activity_window(
-        token, client_id, client_secret, from_ts, to_ts,
+def fetch_hour_window(auth, from_ts, to_ts, limit=1000, offset_ceiling=10000, verbose=False,
+                      rate_limiter=None, filters=None, activity_endpoint_url=None):
+    """
+    Fetch one hour (from_ts..to_ts, epoch ms) as a single window of pages.
+    Returns (events, need_minute_fallback); when the fallback is needed the
+    events are incomplete and fetch_minute_fallback() must be used for the
+    hour instead. The window stops at offset_ceiling, so it never holds more
+    events than that.
+    """
+    return fetch_activity_window(
+        auth, from_ts, to_ts,
         limit=limit, offset_ceiling=offset_ceiling, verbose=verbose,
         rate_limiter=rate_limiter, filters=filters, activity_endpoint_url=activity_endpoint_url
     )
 
-    if not need_minute_fallback:
-        if verbose:
-            print(f"   ✅ Hour OK: {len(hour_events_from_api)} events")
-        return hour_events_from_api, token
-
-    collected = []
-    if verbose:
-        print("   ↪️ Starting minute-by-minute fallback (60 minutes).")
-    for m in range(60):
-        minute_start = hour_start_dt + timedelta(minutes=m)
-        minute_end = minute_start + timedelta(minutes=1) - timedelta(milliseconds=1)
-        m_from = dt_to_epoch_millis(minute_start)
-        m_to = dt_to_epoch_millis(minute_end)
-
-        if verbose:
-            print(f"      ➤ Minute: {fmt_dt(minute_start)} to {fmt_dt(minute_end)} ... ", end="")
-
-        minute_events, _, token = fetch_activity_window(
-            token, client_id, client_secret, m_from, m_to,
+def fetch_minute_fallback(auth, hour_start_dt, from_ts, to_ts, sink,
+                          limit=1000, verbose=True, rate_limiter=None, filters=None,
+                          activity_endpoint_url=None, minute_workers=8):
+    """
+    Fetch the hour from_ts..to_ts (epoch ms) minute by minute and pass each
+    minute's events to `sink` in time order, so a busy hour is never held in
+    memory in full. Returns the number of events fetched.
+    """
+    def fetch_minute(m):
+        # minute edges are plain offsets from the hour start
+        m_from = from_ts + m * 60000
+        m_to = m_from + 59999
+        minute_events, _ = fetch_activity_window(
+            auth, m_from, m_to,
             limit=limit, offset_ceiling=None, verbose=False,
             rate_limiter=rate_limiter, filters=filters, activity_endpoint_url=activity_endpoint_url
         )
-        collected.extend(minute_events)
-        if verbose:
-            print(f"   {len(minute_events)} events")
+        return m, minute_events
+
+    collected = 0
+    # usually 60, but the local hour repeated when DST ends spans 120 minutes
+    minutes = (to_ts - from_ts + 1) // 60000
+    if verbose:
+        print(f"   ↪️ Starting minute-by-minute fallback ({minutes} minutes, {minute_workers} in parallel).")
+    # minute windows are independent, so fetch them concurrently; map() keeps them in order
+    executor = ThreadPoolExecutor(max_workers=minute_workers)
+    try:
+        for m, minute_events in executor.map(fetch_minute, range(minutes)):
+            sink(minute_events)
+            collected += len(minute_events)
+            if verbose:
+                # local wall-clock time of the minute, also right past a DST change
+                minute_start = datetime.fromtimestamp((from_ts + m * 60000) / 1000)
+                minute_end = minute_start + timedelta(minutes=1) - timedelta(milliseconds=1)
+                print(f"      ➤ Minute: {fmt_dt(minute_start)} to {fmt_dt(minute_end)} ...    {len(minute_events)} events")
+    finally:
+        # on Ctrl-C (or an error) drop the minutes not started yet instead of fetching them all
+        executor.shutdown(cancel_futures=True)
 
     if verbose:
-        print(f"   ✅ Fallback minute total: {len(collected)} events for hour {hour_start_dt.strftime('%Y-%m-%d %H:00')}")
-    return collected, token
+        print(f"   ✅ Fallback minute total: {collected} events for hour {hour_start_dt.strftime('%Y-%m-%d %H:00')}")
+    return collected
 
 # =============================
 # CSV UTILITIES
 # =============================
+class ReportFile:
+    """
+    Append-only output file of one category: CSV (header written once) or
+    JSON Lines, plain or gzip-compressed.
+    end_hour() returns a size the file can later be truncated to on resume.
+    With gzip each hour is written as its own gzip member (members simply
+    concatenate when read), so that size is always a valid end of file.
+    """
+    def __init__(self, path: str, fieldnames=None, compress: bool = False):
+        self.path = path
+        self.fieldnames = fieldnames
+        self.compress = compress
+        # 1 MiB buffer: large hours go to disk in few big write() calls
+        self.raw = open(path, "ab", buffering=1 << 20)
+        # append mode starts at the end: position 0 means a new (or empty) file
+        self.needs_header = fieldnames is not None and self.raw.tell() == 0
+        self.stream = None
+        self._writer = None
+        if self.needs_header:
+            self.writer()
+
+    def writer(self):
+        """
+        csv.writer for CSV output, the text stream itself for JSON Lines.
+        """
+        if self.stream is None:
+            binary = self.raw
+            if self.compress:
+                binary = gzip.GzipFile(fileobj=self.raw, mode="wb", compresslevel=3)
+            self.stream = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+            if self.fieldnames is None:
+                self._writer = self.stream
+            else:
+                self._writer = csv.writer(self.stream, delimiter=';')
+                if self.needs_header:
+                    self._writer.writerow(self.fieldnames)
+                    self.needs_header = False
+        return self._writer
+
+    def end_hour(self) -> int:
+        if self.stream is not None:
+            if self.compress:
+                # closes the gzip member only; the GzipFile does not own self.raw
+                self.stream.close()
+                self.stream = None
+            else:
+                self.stream.flush()
+        self.raw.flush()
+        return self.raw.tell()
+
+    def close(self):
+        if self.stream is not None:
+            if self.compress:
+                self.stream.close()
+            else:
+                # the wrapper would close self.raw too; let it go and flush instead
+                self.stream.detach()
+            self.stream = None
+        self.raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+_TS_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(Z?)")
+
+@functools.lru_cache(maxsize=4096)
+def _parse_iso_timestamp(ts: str):
+    # events of the same second share the string, hence the cache; the regex
+    # covers the plain "YYYY-MM-DDTHH:MM:SS[Z]" shape, anything else is slow path
+    m = _TS_RE.fullmatch(ts)
+    if m:
+        year, month, day, hour, minute, second, z = m.groups()
+        try:
+            return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                            tzinfo=timezone.utc if z else None)
+        except ValueError:
+            return None
+    try:
+        return datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
 def _parse_event_datetime(ev):
     ts_val = ev.get("timestamp")
     if isinstance(ts_val, str) and ts_val:
-        try:
-            return datetime.fromisoformat(ts_val.replace("Z", "+00:00"))
-        except ValueError:
-            pass
+        dt = _parse_iso_timestamp(ts_val)
+        if dt is not None:
+            return dt
     elif isinstance(ts_val, (int, float)):
         try:
             return datetime.fromtimestamp(ts_val / 1000)
@@ -452,79 +875,116 @@ def _parse_event_datetime(ev):
     d = ev.get("date")
     t = ev.get("time")
     if isinstance(d, str) and isinstance(t, str):
-        try:
-            return datetime.fromisoformat(f"{d}T{t}")
-        except ValueError:
-            pass
+        return _parse_iso_timestamp(f"{d}T{t}")
     return None
 
+# column order of the rows built by _custom_format_row / _raw_event_row
+CUSTOM_CSV_COLUMNS = (
+    "Date", "Time", "Policy Identity", "Identity Type", "Identities",
+    "Identity Types", "Record Type", "Internal Ip Address",
+    "External Ip Address", "Action", "Destination", "Categories", "Full Event JSON"
+)
+RAW_CSV_COLUMNS = ("timestamp", "full_event_json")
+
+def _custom_format_row(ev) -> tuple:
+    # bound once: the row reads a dozen keys of the event
+    get = ev.get
+    identities_data = get('identities') or ()
+    # `or {}` only builds a dict when the key is missing, unlike get(key, {})
+    policy_identity = ((get('rule') or {}).get('label')
+                       or (get('policy') or {}).get('name')
+                       or get('policyName') or '')
+    # one pass collects labels, types and (if still missing) the policyIdentity;
+    # events carry one identity or a few, so the "; "-joined columns are built
+    # as plain strings instead of lists joined afterwards
+    identity_labels = identity_types = first_identity_type = None
+    for id_data in identities_data:
+        try:
+            label = id_data.get('label')
+        except AttributeError:
+            # identities are JSON objects; anything else (rare) is skipped
+            continue
+        if not policy_identity:
+            policy_identity = id_data.get('policyIdentity') or ''
+        if isinstance(label, str):
+            identity_labels = label if identity_labels is None else f"{identity_labels}; {label}"
+        if isinstance(type_obj := id_data.get('type'), dict):
+            type_obj = type_obj.get('label')
+        if isinstance(type_obj, str):
+            if identity_types is None:
+                first_identity_type = identity_types = type_obj
+            else:
+                identity_types = f"{identity_types}; {type_obj}"
+    categories_data = get('categories', [])
+    category_labels = [cat_data.get('label', '') for cat_data in categories_data if isinstance(cat_data, dict) and cat_data.get('label')]
+    ts = get('timestamp')
+    if (isinstance(ts, str) and _TS_RE.match(ts)
+            and _parse_iso_timestamp(ts) is not None):
+        # valid string starting "YYYY-MM-DD[T ]HH:MM:SS": those fields are the
+        # columns as they are (other ISO shapes go through the datetime below)
+        date_str, time_str = ts[:10], ts[11:19]
+    elif (dt := _parse_event_datetime(ev)) is None:
+        date_str = time_str = ""
+    else:
+        # plain attribute formatting: strftime re-parses its format on every call
+        date_str = f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}"
+        time_str = f"{dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}"
+    # positional row in CUSTOM_CSV_COLUMNS order (no per-row dict to build and look up)
+    return (
+        date_str,
+        time_str,
+        policy_identity,
+        first_identity_type or "",
+        identity_labels or "",
+        identity_types or "",
+        get('recordType', get('type', '')),
+        get('internalip', ''),
+        get('externalip', ''),
+        get('verdict', ''),
+        get('domain', get('dest', get('url', ''))),
+        "; ".join(category_labels),
+        json_dumps(ev)
+    )
+
 def save_to_csv_custom_format(events, writer):
-    for ev in events:
-        dt = _parse_event_datetime(ev)
-        policy_identity = ''
-        if ev.get('rule', {}) and ev.get('rule', {}).get('label'):
-            policy_identity = ev['rule']['label']
-        elif ev.get('policy', {}) and ev.get('policy', {}).get('name'):
-            policy_identity = ev['policy']['name']
-        elif ev.get('policyName'):
-            policy_identity = ev['policyName']
-        else:
-            for id_data in ev.get('identities', []):
-                if isinstance(id_data, dict) and id_data.get('policyIdentity'):
-                    policy_identity = id_data['policyIdentity']
-                    break
-        identities_data = ev.get('identities', [])
-        identity_labels = []
-        identity_types = []
-        for id_data in identities_data:
-            if isinstance(id_data, dict):
-                label = id_data.get('label')
-                if isinstance(label, str):
-                    identity_labels.append(label)
-                id_type_obj = id_data.get('type')
-                if isinstance(id_type_obj, dict):
-                    id_type_label = id_type_obj.get('label')
-                    if isinstance(id_type_label, str):
-                        identity_types.append(id_type_label)
-                elif isinstance(id_type_obj, str):
-                    identity_types.append(id_type_obj)
-        categories_data = ev.get('categories', [])
-        category_labels = [cat_data.get('label', '') for cat_data in categories_data if isinstance(cat_data, dict) and cat_data.get('label')]
-        writer.writerow({
-            "Date": dt.strftime("%Y-%m-%d") if dt else "",
-            "Time": dt.strftime("%H:%M:%S") if dt else "",
-            "Policy Identity": policy_identity,
-            "Identity Type": identity_types[0] if identity_types else "",
-            "Identities": "; ".join(identity_labels),
-            "Identity Types": "; ".join(identity_types),
-            "Record Type": ev.get('recordType', ev.get('type', '')),
-            "Internal Ip Address": ev.get('internalip', ''),
-            "External Ip Address": ev.get('externalip', ''),
-            "Action": ev.get('verdict', ''),
-            "Destination": ev.get('domain', ev.get('dest', ev.get('url', ''))),
-            "Categories": "; ".join(category_labels),
-            "Full Event JSON": json.dumps(ev, ensure_ascii=False)
-        })
+    # events may be any iterable (a list or a lazy filter over one)
+    # a single writerows() call per batch; map() drives the row builder from C
+    writer.writerows(map(_custom_format_row, events))
+
+def _raw_event_row(ev) -> tuple:
+    dt = _parse_event_datetime(ev)
+    return (
+        dt.isoformat() if dt else "",
+        json_dumps(ev)
+    )
 
 def save_raw_events_to_csv(events, writer):
-    for ev in events:
-        dt = _parse_event_datetime(ev)
-        writer.writerow({
-            "timestamp": dt.isoformat() if dt else "",
-            "full_event_json": json.dumps(ev, ensure_ascii=False)
-        })
+    writer.writerows(map(_raw_event_row, events))
+
+def save_to_jsonl(events, fp):
+    # one compact JSON document per line: round-trippable and no CSV quoting
+    fp.writelines(json_dumps(ev) + "\n" for ev in events)
+
+def _is_excluded(ev, excluded_identity_names) -> bool:
+    # True if any of the event's identities has an excluded label
+    return any(
+        isinstance(id_data, dict) and id_data.get('label') in excluded_identity_names
+        for id_data in ev.get('identities') or ()
+    )
+
+_SANITIZE_RE = re.compile(r'[^\w.\-]')
 
 def sanitize_filename(text: str) -> str:
     text = text.replace(" ", "_")
-    text = re.sub(r'[^\w.\-]', '', text)
+    text = _SANITIZE_RE.sub('', text)
     return text.lower()
 
 # =============================
 # MAIN FUNCTION
 # =============================
 def main():
-    # 1) Credentials with test (this will also set REPORTS_BASE global)
-    client_id, client_secret, token = prompt_credentials_with_test()
+    # 1) Credentials with test (this also discovers the reports base)
+    auth = prompt_credentials_with_test()
 
     # 2) Prompt for year/month/day(s)
     year, month, days_to_process, selected_day_for_filename = interactive_prompt_dates()
@@ -569,29 +1029,48 @@ def main():
     print("\n--- CSV Output Format Options ---")
     print("1. Custom formatted CSV (Date;Time;Policy Identity;...)")
     print("2. All Data (Raw JSON event in a column)")
+    print("3. JSON Lines (one raw JSON event per line, .jsonl)")
     while True:
-        csv_format_choice = input("Enter your choice (1 or 2): ").strip()
-        if csv_format_choice in ['1', '2']:
+        csv_format_choice = input("Enter your choice (1, 2 or 3): ").strip()
+        if csv_format_choice in ['1', '2', '3']:
             break
-        print("Invalid input. Enter 1 or 2.")
+        print("Invalid input. Enter 1, 2 or 3.")
 
     if csv_format_choice == '1':
-        csv_fieldnames = [
-            "Date", "Time", "Policy Identity", "Identity Type", "Identities",
-            "Identity Types", "Record Type", "Internal Ip Address",
-            "External Ip Address", "Action", "Destination", "Categories", "Full Event JSON"
-        ]
+        csv_fieldnames = CUSTOM_CSV_COLUMNS
         save_events_function = save_to_csv_custom_format
         csv_format_suffix = "custom"
-    else:
-        csv_fieldnames = ["timestamp", "full_event_json"]
+        output_ext = ".csv"
+    elif csv_format_choice == '2':
+        csv_fieldnames = RAW_CSV_COLUMNS
         save_events_function = save_raw_events_to_csv
         csv_format_suffix = "raw_json"
+        output_ext = ".csv"
+    else:
+        # JSON Lines: the save function writes to the text stream directly
+        csv_fieldnames = None
+        save_events_function = save_to_jsonl
+        csv_format_suffix = "raw_json"
+        output_ext = ".jsonl"
+
+    # 6b) Optional gzip compression of the output file
+    print("\n--- Compression ---")
+    print("1. No compression")
+    print("2. gzip (.gz, several times smaller for large reports)")
+    while True:
+        compress_choice = input("Enter your choice (1 or 2): ").strip()
+        if compress_choice in ['1', '2']:
+            break
+        print("Invalid input. Enter 1 or 2.")
+    compress_output = compress_choice == '2'
+    if compress_output:
+        output_ext += ".gz"
 
     # 7) Exclusion filters
-    excluded_identity_names = {"user_a", "user_b", "service_account_1"}
+    excluded_identity_names = frozenset({"user_a", "user_b", "service_account_1"})
 
-    # 8) Optional action filter: "allowed" or "blocked"
+    # 8) Optional action filter: "allowed" or "blocked", sent to the API as
+    # `verdict` so the server returns fewer rows (fewer pages, fewer fallbacks)
     action_filter = None
     print("\n--- Action Filter ---")
     print("1. No filter")
@@ -617,63 +1096,133 @@ def main():
     total_categories = len(categories_to_process_list)
 
     for cat_idx, (current_api_filters, current_category_filename_segment) in enumerate(categories_to_process_list, start=1):
-        csv_file = f"activity_{year}_{month:02d}_{selected_day_for_filename}_{current_category_filename_segment}_{event_type_filter}_{csv_format_suffix}.csv"
+        if action_filter:
+            current_api_filters = {**current_api_filters, "verdict": action_filter}
+        csv_file = f"activity_{year}_{month:02d}_{selected_day_for_filename}_{current_category_filename_segment}_{event_type_filter}_{csv_format_suffix}{output_ext}"
+        # what the rows of this file depend on beyond its name (the verdict
+        # filter is not part of it); a checkpoint is only resumed if it matches
+        run_params = {"filters": current_api_filters, "format": f"{csv_format_suffix}{output_ext}"}
+        # resume an unfinished run of the same report, otherwise
         # ensure unique filename using _001, _002 pattern
-        csv_file = get_unique_filename(csv_file)
+        resumable_file, last_done, resume_size = find_resumable_file(csv_file, run_params)
+        if last_done:
+            csv_file = resumable_file
+            # drop whatever was written after the last completed hour
+            os.truncate(csv_file, resume_size)
+            print(f"\n♻️ Resuming '{csv_file}' after {last_done[0]}-{last_done[1]:02d}-{last_done[2]:02d} {last_done[3]:02d}:00")
+        else:
+            csv_file = get_unique_filename(csv_file)
+        state_file = f"{csv_file}.state"
 
         print(f"\n🚀 Starting collection for category {cat_idx}/{total_categories}: '{current_category_filename_segment}'")
         print(f"📂 Saving into file: '{csv_file}'")
-        file_exists = os.path.exists(csv_file)
-
-        with open(csv_file, "a", newline="", encoding="utf-8") as f:
-            csv_writer = csv.DictWriter(f, fieldnames=csv_fieldnames, delimiter=';')
-            if not file_exists:
-                csv_writer.writeheader()
 
+        with ReportFile(csv_file, csv_fieldnames, compress=compress_output) as output:
             rate_limiter = RateLimiter(max_requests=18000, per_seconds=3600)
             start_time = time.time()
             total_events_for_this_category = 0
+            hour_saved = 0
+
+            def save_batch(events):
+                nonlocal hour_saved
+                # Apply exclusion filters: one flag per event, then the kept events are
+                # handed over lazily (no filtered copy of the batch)
+                if excluded_identity_names:
+                    keep = [not _is_excluded(ev, excluded_identity_names) for ev in events]
+                    hour_saved += sum(keep)
+                    events = select_kept(events, keep)
+                else:
+                    hour_saved += len(events)
+                save_events_function(events, output.writer())
+
+            # shared by the hour workers and the minute fallback of this category
+            fetch_options = dict(
+                limit=1000,
+                rate_limiter=rate_limiter,
+                filters=current_api_filters,
+            )
 
-            for idx, current_day in enumerate(days_to_process):
-                print(f"\n📅 Day: {current_day} ({idx + 1}/{len(days_to_process)})")
-                for hour in range(24):
-                    hour_start = datetime(year, month, current_day, hour, 0, 0)
-                    print(f"⏱️ Elapsed: {elapsed(start_time)} | Category {cat_idx}/{total_categories}: Saving to '{csv_file}'")
-
-                    # ensure we use the latest discovered reports base for the endpoint
-                    activity_endpoint_url = f"{REPORTS_BASE}/v2/activity/{event_type_filter}"
-
-                    events_hour, token = fetch_hour_with_minute_fallback(
-                        token=token,
-                        client_id=client_id,
-                        client_secret=client_secret,
-                        hour_start_dt=hour_start,
-                        limit=1000,
-                        offset_ceiling=10000,
-                        verbose=True,
-                        rate_limiter=rate_limiter,
-                        filters=current_api_filters,
-                        activity_endpoint_url=activity_endpoint_url
-                    )
-
-                    # Apply exclusion filters
-                    if excluded_identity_names:
-                        events_hour = [
-                            ev for ev in events_hour
-                            if not any(
-                                (isinstance(id_data, dict) and id_data.get('label') in excluded_identity_names)
-                                for id_data in ev.get('identities', [])
-                            )
-                        ]
-
-                    # Apply action filter
-                    if action_filter:
-                        events_hour = [ev for ev in events_hour if ev.get('verdict', '').lower() == action_filter]
-
-                    print(f"   ✅ Hour OK: {len(events_hour)} events")
-                    save_events_function(events_hour, csv_writer)
-                    total_events_for_this_category += len(events_hour)
-
+            def activity_endpoint_url():
+                # built per hour, so the latest discovered reports base is used
+                # (a 403 refresh may move the run to another region)
+                return f"{auth.reports_base}/v2/activity/{event_type_filter}"
+
+            def fetch_hour(from_ts, to_ts):
+                # runs on a worker thread, so it stays quiet: the main thread logs
+                # each hour when it writes it, keeping the output in hour order
+                return fetch_hour_window(
+                    auth, from_ts, to_ts,
+                    offset_ceiling=10000, verbose=False,
+                    activity_endpoint_url=activity_endpoint_url(), **fetch_options
+                )
+
+            written_day = None
+
+            def write_hour(day_idx, current_day, hour, hour_start, from_ts, to_ts, future):
+                nonlocal hour_saved, total_events_for_this_category, written_day
+                if current_day != written_day:
+                    # announced here, not when fetching starts, to stay in order with the hours
+                    written_day = current_day
+                    print(f"\n📅 Day: {current_day} ({day_idx + 1}/{len(days_to_process)})")
+                if future is None:
+                    # local hour skipped by a DST change: it has no time span of its own
+                    print(f"\n⏳ Hourly: {fmt_dt(hour_start)} does not exist in local time (DST). Skipping.")
+                    return
+                hour_saved = 0
+                print(f"\n⏳ Hourly: {fmt_dt(hour_start)} to {fmt_dt(datetime.fromtimestamp(to_ts / 1000))}")
+                hour_events, need_minute_fallback = future.result()
+                if need_minute_fallback:
+                    # busy hour: fetched here minute by minute and written as it arrives
+                    fetch_minute_fallback(auth, hour_start, from_ts, to_ts, sink=save_batch,
+                                          verbose=True, activity_endpoint_url=activity_endpoint_url(),
+                                          **fetch_options)
+                else:
+                    save_batch(hour_events)
+                print(f"⏱️ Elapsed: {elapsed(start_time)} | Category {cat_idx}/{total_categories}: Saving to '{csv_file}'")
+                print(f"   ✅ Hour OK ({current_day:02d} {hour:02d}:00): {hour_saved} events")
+                total_events_for_this_category += hour_saved
+
+                save_checkpoint(state_file, (year, month, current_day, hour), output.end_hour(), run_params)
+
+            def hours_to_fetch():
+                # every remaining hour of every selected day, as one sequence, so the
+                # fetch window runs on across day boundaries instead of draining
+                for day_idx, current_day in enumerate(days_to_process):
+                    # epoch-ms boundaries of the day's 24 hours (25 edges), computed once
+                    day_start = datetime(year, month, current_day)
+                    hour_edges = [dt_to_epoch_millis(day_start + timedelta(hours=h)) for h in range(25)]
+                    for hour in range(24):
+                        if last_done and (year, month, current_day, hour) <= last_done:
+                            continue
+                        hour_start = datetime(year, month, current_day, hour, 0, 0)
+                        yield day_idx, current_day, hour, hour_start, hour_edges[hour], hour_edges[hour + 1] - 1
+
+            # hours are independent: fetch up to hour_workers of them at once, but
+            # write (and checkpoint) strictly in hour order from this thread.
+            # One extra hour is queued so every worker stays busy while we write.
+            # Memory stays bounded: a worker's hour holds at most offset_ceiling
+            # events, and busy hours are streamed minute by minute in write_hour.
+            hour_workers = 4
+            max_in_flight = hour_workers + 1
+            executor = ThreadPoolExecutor(max_workers=hour_workers)
+            try:
+                in_flight = deque()
+                for day_idx, current_day, hour, hour_start, from_ts, to_ts in hours_to_fetch():
+                    # an hour skipped by DST (empty span) still goes through the window,
+                    # so write_hour reports it in order with the others
+                    future = executor.submit(fetch_hour, from_ts, to_ts) if to_ts >= from_ts else None
+                    in_flight.append((day_idx, current_day, hour, hour_start, from_ts, to_ts, future))
+                    # bounded window, so finished-but-unwritten hours do not pile up in memory
+                    if len(in_flight) >= max_in_flight:
+                        write_hour(*in_flight.popleft())
+                while in_flight:
+                    write_hour(*in_flight.popleft())
+            finally:
+                # on Ctrl-C (or an error) drop the queued hours instead of fetching them first
+                executor.shutdown(cancel_futures=True)
+
+            if os.path.exists(state_file):
+                os.remove(state_file)
             print(f"\n🏁 Completed category {cat_idx}/{total_categories}: {total_events_for_this_category} events saved in '{csv_file}'")
             print(f"⏱️ Total time for this category: {elapsed(start_time)}")
 
@@ -0,0 +1,148 @@
+"""
+Unit tests for cisco-secure-access-report.py.
+
+Run from the code directory with:
+    python -m unittest test_cisco_secure_access_report
+"""
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+# the script name has dashes, so it is loaded from its path
+_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cisco-secure-access-report.py")
+_spec = importlib.util.spec_from_file_location("cisco_secure_access_report", _SCRIPT)
+report = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(report)
+
+
+def compact_dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+VALID_PAGES = [
+    '{"data":[]}',
+    '{}',
+    '[]',
+    '"text"',
+    '{"data":[{"a":1,"b":"x"},{"c":[1,2,{"d":null}]}],"meta":{"n":2}}',
+    ' { "data" : [ { "a" : 1 } , {"b":true} ] , "x" : false } \n',
+    '{"data":[{"ts":1700000000000,"neg":-5,"zero":0}]}',
+    '{"data":[{"f":1.5,"e":1e3,"ne":-0}]}',
+    '{"data":[{"s":"caf\\u00e9 \\"q\\" \\n"},{"u":"café"}]}',
+    '{"data":[1,"two",null,[3]]}',
+    '{"data":{"a":1}}',
+    '{"data":[{"a":1}],"data":[{"b":2}]}',
+    '{"data":[{"a":1,"a":2}]}',
+    '{"data":[{"big":123456789012345678901234567890}]}',
+]
+
+INVALID_PAGES = [
+    '',
+    '{',
+    '{"data":[{"a":1}]',
+    '{"data":[{"a":1},]}',
+    '{"data":[{"a":1}}',
+    '{"data":[{"a":1} {"b":2}]}',
+    '{"data":[]} extra',
+    '{"data":[],}',
+    '{1:2}',
+    '{"a" 1}',
+    '{"a":1 "b":2}',
+    '{"data":[{"a":01}]}',
+    '{"data":[{"a":tru}]}',
+    '{"data":["\x01"]}',
+]
+
+
+class LoadsActivityPageTest(unittest.TestCase):
+
+    def test_valid_input_matches_json_loads(self):
+        for text in VALID_PAGES:
+            with self.subTest(text=text):
+                page = report._loads_activity_page(text)
+                self.assertEqual(page, json.loads(text))
+                self.assertEqual(type(page), type(json.loads(text)))
+
+    def test_invalid_input_raises_like_json_loads(self):
+        for text in INVALID_PAGES:
+            with self.subTest(text=text):
+                with self.assertRaises(json.JSONDecodeError):
+                    json.loads(text)
+                with self.assertRaises(json.JSONDecodeError):
+                    report._loads_activity_page(text)
+
+    def test_only_compact_events_keep_their_text(self):
+        page = report._loads_activity_page(
+            '{"data":[{"a":1,"b":"x"},{"a": 1},{"f":1.5},{"s":"\\u00e9"},{"a":-0}]}')
+        kept = [type(ev) is report.RawEvent for ev in page["data"]]
+        self.assertEqual(kept, [True, False, False, False, False])
+
+
+class JsonDumpsTest(unittest.TestCase):
+
+    EVENTS = [
+        {"a": 1, "b": "x"},
+        {"timestamp": 1700000000000, "identities": [{"label": "café", "type": {"label": "AD User"}}]},
+        {"nested": {"l": [1, -2, 0, None, True, False, ""]}, "empty": {}},
+    ]
+
+    def test_raw_event_matches_compact_json_dumps(self):
+        text = compact_dumps({"data": self.EVENTS})
+        page = report._loads_activity_page(text)
+        for event, expected in zip(page["data"], self.EVENTS):
+            with self.subTest(event=expected):
+                self.assertIs(type(event), report.RawEvent)
+                self.assertEqual(report.json_dumps(event), compact_dumps(expected))
+
+    def test_stdlib_fallback_matches_compact_json_dumps(self):
+        with mock.patch.object(report, "orjson", None):
+            for event in self.EVENTS:
+                with self.subTest(event=event):
+                    self.assertEqual(report.json_dumps(event), compact_dumps(event))
+
+
+class CheckpointTest(unittest.TestCase):
+
+    RUN = {"filters": {"verdict": "blocked"}, "format": ".csv"}
+    OTHER_RUN = {"filters": {}, "format": ".csv"}
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.filename = os.path.join(tmp.name, "activity.csv")
+
+    def write_run(self, filename, run_params):
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write("header\n")
+        report.save_checkpoint(f"{filename}.state", (2024, 3, 1, 5), 7, run_params)
+
+    def test_load_checkpoint_same_run_params(self):
+        self.write_run(self.filename, self.RUN)
+        self.assertEqual(report.load_checkpoint(f"{self.filename}.state", self.RUN),
+                         ((2024, 3, 1, 5), 7))
+
+    def test_load_checkpoint_refuses_other_run_params(self):
+        self.write_run(self.filename, self.RUN)
+        self.assertEqual(report.load_checkpoint(f"{self.filename}.state", self.OTHER_RUN),
+                         (None, None))
+
+    def test_find_resumable_file_refuses_other_run_params(self):
+        self.write_run(self.filename, self.RUN)
+        with mock.patch("builtins.print"):
+            self.assertEqual(report.find_resumable_file(self.filename, self.OTHER_RUN),
+                             (None, None, None))
+
+    def test_find_resumable_file_skips_to_matching_run(self):
+        self.write_run(self.filename, self.OTHER_RUN)
+        second = os.path.join(os.path.dirname(self.filename), "activity_001.csv")
+        self.write_run(second, self.RUN)
+        with mock.patch("builtins.print"):
+            self.assertEqual(report.find_resumable_file(self.filename, self.RUN),
+                             (second, (2024, 3, 1, 5), 7))
+
+
+if __name__ == "__main__":
+    unittest.main()